@@ -97,7 +97,7 @@ def number_of_grid_points(box_size, spacing=0.375):
     y = np.floor(box_size[1] / spacing) // 2 * 2 + 1
     z = np.floor(box_size[2] / spacing) // 2 * 2 + 1
 
-    npts = np.array([np.int(x), np.int(y), np.int(z)])
+    npts = np.array([int(x), int(y), int(z)])
 
     return npts
 
@@ -10,10 +10,10 @@ from .forcefield import AutoDockForceField
 from .molecule import Molecule
 from .spherical_model_map import SphericalWaterMap
 from .sampling import WaterSampler
-from .water import Water
+from .water import Water, WaterBatch
 from .water_box import WaterBox
 from .waterkit import WaterKit
 
 __all__ = ["Map", "AutoGrid", "AutoDockForceField", "Molecule",
-           "SphericalWaterMap", "WaterSampler", "Water",
+           "SphericalWaterMap", "WaterSampler", "Water", "WaterBatch",
            "WaterBox", "WaterKit"]
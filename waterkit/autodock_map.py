@@ -11,6 +11,7 @@ import os
 import re
 import copy
 import warnings
+from concurrent.futures import ThreadPoolExecutor
 
 import numpy as np
 from scipy import spatial
@@ -21,17 +22,22 @@ from . import utils
 
 class Map():
 
-    def __init__(self, map_files=None, labels=None):
+    def __init__(self, map_files=None, labels=None, dtype=np.float32):
         """Initialize a Map object by reading AutoDock map files.
 
         Args:
             map_files (list): list of the autodock map files
             labels (list): list of the atom types corresponding to each maps
+            dtype (dtype): dtype used to store the grids (default: np.float32)
 
         """
         maps = {}
         prv_grid_information = None
 
+        # Energy lookups are memory-bound, so the grids are stored in
+        # single precision per default; np.float64 can be used to validate
+        self._dtype = np.dtype(dtype)
+
         if map_files is not None and labels is not None:
             if not isinstance(map_files, (list, tuple)):
                 map_files = [map_files]
@@ -113,8 +119,40 @@ class Map():
         """
         return copy.deepcopy(self)
 
+    def __deepcopy__(self, memo):
+        """Deep copy the Map object.
+
+        The kdtree and the bin edges only depend on the grid geometry,
+        which never changes once the map is created, so they are shared
+        with the copy instead of being rebuilt. Only the affinity maps
+        are really duplicated, and their interpolators are regenerated
+        from the copied grids.
+        """
+        cls = self.__class__
+        new_map = cls.__new__(cls)
+        memo[id(self)] = new_map
+
+        # Immutable once the map is created, shared between copies
+        shared = ("_kdtree", "_edges")
+
+        for name, value in self.__dict__.items():
+            if name in shared:
+                setattr(new_map, name, value)
+            elif name == "_maps":
+                new_map._maps = {label: affinity_map.copy() for label, affinity_map in value.items()}
+            elif name == "_maps_interpn":
+                continue
+            else:
+                setattr(new_map, name, copy.deepcopy(value, memo))
+
+        if "_maps_interpn" in self.__dict__:
+            new_map._maps_interpn = {label: new_map._generate_affinity_map_interpn(affinity_map)
+                                     for label, affinity_map in new_map._maps.items()}
+
+        return new_map
+
     @classmethod
-    def from_fld(cls, fld_file):
+    def from_fld(cls, fld_file, dtype=np.float32):
         """Read a fld file.
 
         The AutoDock map files are read using the information contained
@@ -122,6 +160,7 @@ class Map():
 
         Args:
             fld_file (str): pathname of the AutoGrid fld file.
+            dtype (dtype): dtype used to store the grids (default: np.float32)
 
         Returns:
             Map: Instance of Map object.
@@ -143,7 +182,7 @@ class Map():
                     map_files.append(path + os.sep + line.split(" ")[2].split("=")[1].split("/")[-1])
 
         if map_files and labels:
-            return cls(map_files, labels)
+            return cls(map_files, labels, dtype)
 
     def _grid_information_from_map(self, map_file):
         """Read grid information in the map file"""
@@ -173,13 +212,14 @@ class Map():
         Take a grid file and extract gridcenter, spacing and npts info
         """
         with open(map_file) as f:
-            # Read all the lines directly
-            lines = f.readlines()
+            # Read the 6 header lines before the grid values
+            header = [f.readline() for _ in range(6)]
 
-            npts = np.array(lines[4].split(" ")[1:4], dtype=int) + 1
+            npts = np.array(header[4].split(" ")[1:4], dtype=int) + 1
 
-            # Get the energy for each grid element
-            affinity = [float(line) for line in lines[6:]]
+            # Get the energy for each grid element, the parsing is done
+            # by the numpy compiled reader instead of one float() per line
+            affinity = np.loadtxt(f, dtype=self._dtype)
             # Some sorceries happen here --> swap x and z axes
             affinity = np.swapaxes(np.reshape(affinity, npts[::-1]), 0, 2)
 
@@ -248,9 +288,9 @@ class Map():
         """
         if not name in self._maps:
             if fill_value is None:
-                new_map = np.zeros(self._npts)
+                new_map = np.zeros(self._npts, dtype=self._dtype)
             else:
-                new_map = np.full(self._npts, fill_value)
+                new_map = np.full(self._npts, fill_value, dtype=self._dtype)
 
             self._maps[name] = new_map
             self._maps_interpn[name] = self._generate_affinity_map_interpn(new_map)
@@ -268,8 +308,7 @@ class Map():
             grid (array_like): grid
 
         """
-        if not isinstance(new_map, np.ndarray):
-            new_map = np.array(new_map)
+        new_map = np.asarray(new_map, dtype=self._dtype)
 
         if not np.array_equal(new_map.shape, self._npts):
             raise RuntimeError("New grid does not have the same dimension (%s != %s)" % (new_map.shape, self._npts))
@@ -545,7 +584,7 @@ class Map():
         """
         coordinates = np.atleast_2d(coordinates)
 
-        new_map = np.zeros(self._npts) + mask_value
+        new_map = np.zeros(self._npts, dtype=self._dtype) + mask_value
 
         try:
             current_map = self._maps[name]
@@ -588,7 +627,7 @@ class Map():
             assert len(atom_types) == 1, "Multiple atom types cannot replace the same atom type."
 
         if name not in self._maps:
-            self._maps[name] = np.zeros(self._npts)
+            self._maps[name] = np.zeros(self._npts, dtype=self._dtype)
 
         """ Get the common maps, the requested ones and the actual ones that we have 
         and check maps that we cannot process because there are not present in one
@@ -715,24 +754,47 @@ class Map():
         elif not isinstance(map_types, (list, tuple)):
             map_types = [map_types]
 
+        existing_types = []
+
         for map_type in map_types:
             if map_type in self._maps:
-                filename = "%s.map" % map_type
-                if prefix is not None:
-                    filename = "%s.%s" % (prefix, filename)
-
-                with open(filename, "w") as w:
-                    npts = np.array([n if not n % 2 else n - 1 for n in self._npts])
-
-                    # Write header
-                    w.write("GRID_PARAMETER_FILE %s\n" % grid_parameter_file)
-                    w.write("GRID_DATA_FILE %s\n" % grid_data_file)
-                    w.write("MACROMOLECULE %s\n" % macromolecule)
-                    w.write("SPACING %s\n" % self._spacing)
-                    w.write("NELEMENTS %s\n" % " ".join(npts.astype(str)))
-                    w.write("CENTER %s\n" % " ".join(self._center.astype(str)))
-                    # Write grid (swap x and z axis before)
-                    m = np.swapaxes(self._maps[map_type], 0, 2).flatten()
-                    w.write("\n".join(m.astype(str)))
+                existing_types.append(map_type)
             else:
                 print("Error: Map %s does not exist." % map_type)
+
+        """The maps are independent files, so when there are several of
+        them they are written by a thread pool; the numpy serialization
+        releases the GIL and the disk writes overlap."""
+        if len(existing_types) > 1:
+            with ThreadPoolExecutor() as executor:
+                futures = [executor.submit(self._write_map, map_type, prefix, grid_parameter_file,
+                                           grid_data_file, macromolecule)
+                           for map_type in existing_types]
+
+                # Any exception raised by a worker (unwritable file,
+                # disk full, ...) is re-raised here
+                for future in futures:
+                    future.result()
+        elif existing_types:
+            self._write_map(existing_types[0], prefix, grid_parameter_file,
+                            grid_data_file, macromolecule)
+
+    def _write_map(self, map_type, prefix, grid_parameter_file, grid_data_file, macromolecule):
+        """Write one AutoDock map file (see to_map)."""
+        filename = "%s.map" % map_type
+        if prefix is not None:
+            filename = "%s.%s" % (prefix, filename)
+
+        with open(filename, "w") as w:
+            npts = np.array([n if not n % 2 else n - 1 for n in self._npts])
+
+            # Write header
+            w.write("GRID_PARAMETER_FILE %s\n" % grid_parameter_file)
+            w.write("GRID_DATA_FILE %s\n" % grid_data_file)
+            w.write("MACROMOLECULE %s\n" % macromolecule)
+            w.write("SPACING %s\n" % self._spacing)
+            w.write("NELEMENTS %s\n" % " ".join(npts.astype(str)))
+            w.write("CENTER %s\n" % " ".join(self._center.astype(str)))
+            # Write grid (swap x and z axis before)
+            m = np.swapaxes(self._maps[map_type], 0, 2).flatten()
+            w.write("\n".join(m.astype(str)))
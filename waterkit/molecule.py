@@ -6,18 +6,35 @@
 # Class for molecule
 #
 
-import imp
+import functools
 import os
-import re
 
 import numpy as np
 import openbabel as ob
+from scipy import spatial
 
 from .typer import RotatableBonds
 from .typer import HydrogenBonds
 from . import utils
 
 
+@functools.lru_cache(maxsize=None)
+def _rotatable_bonds_typer(fname):
+    """Parse the rotatable bonds parameter file only once.
+
+    The typer only depends on the parameter file, so it is shared
+    between all the molecules instead of being rebuilt (file parsing
+    and SMARTS compilation) at each Molecule creation.
+    """
+    return RotatableBonds(fname)
+
+
+@functools.lru_cache(maxsize=None)
+def _hydrogen_bonds_typer(fname):
+    """Parse the waterfield parameter file only once (see above)."""
+    return HydrogenBonds(fname)
+
+
 class Molecule():
 
     def __init__(self, OBMol, guess_hydrogen_bonds=True, guess_disordered_hydrogens=True):
@@ -36,12 +53,15 @@ class Molecule():
         self.atoms = np.zeros(OBMol.NumAtoms(), dtype)
         self.hydrogen_bonds = None
         self.rotatable_bonds = None
+        self._coordinates = None
+        self._kdtree = None
 
         # Remove all implicit hydrogens because OpenBabel
         # is doing chemical perception, and we want to read the
-        # molecule as is.
+        # molecule as is. The count is tested first, most atoms
+        # have none so the second call is usually short-circuited.
         for x in ob.OBMolAtomIter(OBMol):
-            if x.GetAtomicNum() != 1 and x.GetImplicitHCount() != 0:
+            if x.GetImplicitHCount() != 0 and x.GetAtomicNum() != 1:
                 x.SetImplicitHCount(0)
 
         for r in ob.OBResidueIter(OBMol):
@@ -55,16 +75,16 @@ class Molecule():
             j += 1
 
         # Do the typing for hydrogen bonds and disordered hydrogen atoms
-        d = imp.find_module("waterkit")[1]
+        d = utils.path_module("waterkit")
         
         if guess_disordered_hydrogens:
             dh_file = os.path.join(d, "data/disordered_hydrogens.par")
-            dhfield = RotatableBonds(dh_file)
+            dhfield = _rotatable_bonds_typer(dh_file)
             self._guess_rotatable_bonds(OBMol, dhfield)
 
         if guess_hydrogen_bonds:
             hb_file = os.path.join(d, "data/waterfield.par")
-            hbfield = HydrogenBonds(hb_file)
+            hbfield = _hydrogen_bonds_typer(hb_file)
             self._guess_hydrogen_bond_anchors(OBMol, hbfield)
 
     @classmethod
@@ -128,11 +148,11 @@ class Molecule():
         partial_charges = []
 
         with open(fname) as f:
-            lines = f.readlines()
-            for line in lines:
-                if re.search("^ATOM", line) or re.search("^HETATM", line):
+            for line in f:
+                # Simple prefix test, no need to pay for a regexp per line
+                if line.startswith(("ATOM", "HETATM")):
                     atom_types.append(line[77:79].strip())
-                    partial_charges.append(float(line[70:77].strip()))
+                    partial_charges.append(float(line[70:77]))
 
         return partial_charges, atom_types
 
@@ -152,6 +172,13 @@ class Molecule():
         """
         return self.atoms[i - 1]
 
+    def _atom_indices(self, atom_ids):
+        """Convert 1-based atom ids into 0-based array indices."""
+        if not isinstance(atom_ids, np.ndarray):
+            atom_ids = np.array(atom_ids, dtype=int)
+        # -1 because numpy array is 0-based
+        return atom_ids - 1
+
     def coordinates(self, atom_ids=None):
         """
         Return coordinates of all atoms or a certain atom
@@ -163,16 +190,40 @@ class Molecule():
             ndarray: 2d ndarray of 3d coordinates
 
         """
+        # The contiguous copy of the coordinates is cached, so the
+        # hot callers (kdtree, sampling) only pay for a slice
+        if self._coordinates is None:
+            self._coordinates = np.atleast_2d(self.atoms["xyz"].copy())
+
         if atom_ids is not None and self.atoms.size > 1:
-            if not isinstance(atom_ids, np.ndarray):
-                atom_ids = np.array(atom_ids, dtype=int)
-            # -1 because numpy array is 0-based
-            atoms = self.atoms[atom_ids - 1]["xyz"]
+            atoms = self._coordinates[self._atom_indices(atom_ids)]
         else:
-            atoms = self.atoms["xyz"]
+            atoms = self._coordinates
 
         return np.atleast_2d(atoms).copy()
 
+    def is_clash(self, xyz, molecule=None, radius=1.4):
+        """Check if the coordinates xyz clash with a molecule.
+
+        Args:
+            xyz (array_like): 3d coordinates of one point
+            molecule (Molecule): molecule to check against (default: self)
+            radius (float): clash radius in Angstrom (default: 1.4)
+
+        Returns:
+            bool: True if at least one atom is within radius, False otherwise
+
+        """
+        if molecule is None:
+            molecule = self
+
+        # The kdtree is built only once and cached, so each clash
+        # check is a single O(log N) query instead of a full distance scan
+        if molecule._kdtree is None:
+            molecule._kdtree = spatial.cKDTree(molecule.coordinates())
+
+        return len(molecule._kdtree.query_ball_point(xyz, radius, p=2)) > 0
+
     def atom_types(self, atom_ids=None):
         """Return atom types of all atoms or a certain atom.
         
@@ -184,10 +235,7 @@ class Molecule():
 
         """
         if atom_ids is not None and self.atoms.size > 1:
-            if not isinstance(atom_ids, np.ndarray):
-                atom_ids = np.array(atom_ids, dtype=int)
-            # -1 because numpy array is 0-based
-            t = self.atoms[atom_ids - 1]['t']
+            t = self.atoms[self._atom_indices(atom_ids)]['t']
         else:
             t = self.atoms['t']
 
@@ -204,12 +252,9 @@ class Molecule():
 
         """
         if atom_ids is not None and self.atoms.size > 1:
-            if not isinstance(atom_ids, np.ndarray):
-                atom_ids = np.array(atom_ids, dtype=int)
-            # -1 because numpy array is 0-based
-            q = self.atoms[atom_ids - 1]['q']
+            q = self.atoms[self._atom_indices(atom_ids)]['q']
         else:
-            q =  self.atoms['q']
+            q = self.atoms['q']
 
         return q.copy()
 
@@ -224,10 +269,7 @@ class Molecule():
 
         """
         if atom_ids is not None:
-            if not isinstance(atom_ids, np.ndarray):
-                atom_ids = np.array(atom_ids, dtype=int)
-            # -1 because numpy array is 0-based
-            atoms = self.atoms[atom_ids - 1][['i', 'xyz', 'q', 't']]
+            atoms = self.atoms[self._atom_indices(atom_ids)][['i', 'xyz', 'q', 't']]
         else:
             atoms = self.atoms[['i', 'xyz', 'q', 't']]
 
@@ -271,6 +313,9 @@ class Molecule():
                 self.atoms[atom_id - 1]["xyz"] = xyz
             else:
                 self.atoms["xyz"] = xyz
+            # The cached coordinates and kdtree are not valid anymore
+            self._coordinates = None
+            self._kdtree = None
             return True
         else:
             return False
@@ -283,7 +328,7 @@ class Molecule():
 
         """
         pdbqt_str = "ATOM  %5d %-4s %-3s %1s%4d    %8.3f%8.3f%8.3f  1.00  1.00    %6.3f %-2s\n"
-        output_str = ""
+        lines = []
 
         if self.atoms.size == 1:
             atoms = [self.atoms]
@@ -292,11 +337,12 @@ class Molecule():
 
         for atom in atoms:
             x, y, z = atom["xyz"]
-            output_str += pdbqt_str % (atom["i"], atom["name"], atom["resname"], atom['chain'], atom["resnum"], 
-                                       x, y, z, atom["q"], atom["t"])
+            lines.append(pdbqt_str % (atom["i"], atom["name"], atom["resname"], atom['chain'], atom["resnum"], 
+                                      x, y, z, atom["q"], atom["t"]))
 
+        # All the lines are joined and written in one shot
         with open(fname, 'w') as w:
-            w.write(output_str)
+            w.write("".join(lines))
 
 
     def to_file(self, fname, fformat, options=None, append=False):
@@ -314,7 +360,7 @@ class Molecule():
 
         """
         pdbqt_str = "ATOM  %5d %-4s %-3s %1s%4d    %8.3f%8.3f%8.3f  1.00  1.00    %6.3f %-2s\n"
-        output_str = ""
+        lines = []
 
         if self.atoms.size == 1:
             atoms = [self.atoms]
@@ -323,8 +369,10 @@ class Molecule():
 
         for atom in atoms:
             x, y, z = atom["xyz"]
-            output_str += pdbqt_str % (atom["i"], atom["name"], atom["resname"], atom['chain'], atom["resnum"],
-                                       x, y, z, atom["q"], atom["t"])
+            lines.append(pdbqt_str % (atom["i"], atom["name"], atom["resname"], atom['chain'], atom["resnum"],
+                                      x, y, z, atom["q"], atom["t"]))
+
+        output_str = "".join(lines)
 
         if fformat != "pdbqt":
             OBMol = ob.OBMol()
@@ -358,17 +406,16 @@ class Molecule():
         pdbqt_str = "ATOM  %5d  %-3s ANC%2s%4d    %8.3f%8.3f%8.3f%6.2f 1.00    %6.3f %2s\n"
 
         if self.hydrogen_bonds is not None:
-            i = 1
-            output_str = ""
+            lines = []
 
-            for index, anchor in self.hydrogen_bonds.iterrows():
-                x, y, z = anchor.vector_xyz
-                atom_type = anchor.anchor_type[0].upper()
+            for i, anchor in enumerate(self.hydrogen_bonds):
+                x, y, z = anchor["vector_xyz"]
+                atom_type = anchor["anchor_type"][0].upper()
 
-                output_str += pdbqt_str % (i, atom_type, "A", index, x, y, z, 1, 1, atom_type)
-                i += 1
+                lines.append(pdbqt_str % (i + 1, atom_type, "A", i, x, y, z, 1, 1, atom_type))
 
+            # All the lines are written in one shot
             with open(fname, "w") as w:
-                w.write(output_str)
+                w.write("".join(lines))
         else:
             print("Error: There is no hydrogen bond anchors.")
@@ -6,6 +6,7 @@
 # Class for water network optimizer
 #
 
+import functools
 import os
 import time
 
@@ -16,9 +17,74 @@ from scipy.spatial.transform import Rotation
 
 from .autodock_map import Map
 from .molecule import Molecule
+from .water import WaterBatch
 from . import utils
 
 
+@functools.lru_cache(maxsize=None)
+def _load_water_orientations(water_model):
+    """Load the pre-generated water molecules (only hydrogens) once.
+
+    We will use those to sample the orientation. They are read-only,
+    so they are shared between all the WaterSampler instances instead
+    of being re-read from disk at each construction.
+    """
+    d = utils.path_module("waterkit")
+
+    n_atoms = 2
+    usecols = [0, 1, 2, 3, 4, 5]
+    if water_model == "tip5p":
+        usecols += [6, 7, 8, 9, 10, 11]
+        n_atoms += 2
+
+    w_orientation_file = os.path.join(d, "data/water_orientations.txt")
+    water_orientations = np.loadtxt(w_orientation_file, usecols=usecols)
+    shape = (water_orientations.shape[0], n_atoms, 3)
+
+    return water_orientations.reshape(shape)
+
+
+@functools.lru_cache(maxsize=None)
+def _load_water_map(water_model, spherical_water_map=None):
+    """Load the water grids (spherical + explicit) once (see above)."""
+    d = utils.path_module("waterkit")
+    map_list = []
+
+    # Spherical water grid
+    if spherical_water_map is None:
+        spherical_water_map = os.path.join(d, "data/water/spherical/water_SW.map")
+
+    map_list.append(spherical_water_map)
+
+    # Explicit water grids
+    if water_model == "tip3p":
+        atom_types = ["SW", "OW", "HW"]
+        map_files = ["data/water/tip3p/water_OW.map",
+                     "data/water/tip3p/water_HW.map"]
+    elif water_model == "tip5p":
+        atom_types = ["SW", "OT", "HT", "LP"]
+        map_files = ["data/water/tip5p/water_OT.map",
+                     "data/water/tip5p/water_HT.map",
+                     "data/water/tip5p/water_LP.map"]
+
+    map_list.extend([os.path.join(d, map_file) for map_file in map_files])
+
+    return Map(map_list, atom_types)
+
+
+@functools.lru_cache(maxsize=None)
+def _load_water_ref(water_model):
+    """Load the reference water molecule once (see above)."""
+    d = utils.path_module("waterkit")
+
+    if water_model == "tip3p":
+        water_ref_file = os.path.join(d, "data/water/tip3p/water.pdbqt")
+    elif water_model == "tip5p":
+        water_ref_file = os.path.join(d, "data/water/tip5p/water.pdbqt")
+
+    return Molecule.from_file(water_ref_file)
+
+
 class WaterSampler():
 
     def __init__(self, water_box, temperature=300., spherical_water_map=None, 
@@ -36,48 +102,19 @@ class WaterSampler():
         # Boltzmann constant (kcal/mol)
         self._kb = 0.0019872041
 
-        d = utils.path_module("waterkit")
-
-        # Water orientations set
-        """ Load pre-generated water molecules (only hydrogens)
-        We will use those to sample the orientation."""
-        n_atoms = 2
-        usecols = [0, 1, 2, 3, 4, 5]
-        if self._water_model == "tip5p":
-            usecols += [6, 7, 8, 9, 10, 11]
-            n_atoms += 2
-
-        w_orientation_file = os.path.join(d, "data/water_orientations.txt")
-        water_orientations = np.loadtxt(w_orientation_file, usecols=usecols)
-        shape = (water_orientations.shape[0], n_atoms, 3)
-        self._water_orientations = water_orientations.reshape(shape)
-
-        # Water grids
-        map_list = []
+        # Water orientations set, water grids and reference water
+        # molecule. They are read-only and loaded once per process.
+        self._water_orientations = _load_water_orientations(self._water_model)
+        self._water_map = _load_water_map(self._water_model, spherical_water_map)
+        self._water_ref = _load_water_ref(self._water_model)
 
-        # Spherical water grid
-        if spherical_water_map is None:
-            spherical_water_map = os.path.join(d, "data/water/spherical/water_SW.map")
+    def _spherical_water_energies(self, ad_map, waters):
+        """Grid energies of spherical water molecules, interpolated in one call."""
+        energies = WaterBatch.from_waters(waters).energies(ad_map)
+        # Unfavorable energies are ignored
+        energies[energies > 0] = 0
 
-        map_list.append(spherical_water_map)
-
-        # Explicit water grids
-        if self._water_model == "tip3p":
-            atom_types = ["SW", "OW", "HW"]
-            map_files = ["data/water/tip3p/water_OW.map",
-                         "data/water/tip3p/water_HW.map"]
-            water_ref_file = os.path.join(d, "data/water/tip3p/water.pdbqt")
-        elif self._water_model == "tip5p":
-            atom_types = ["SW", "OT", "HT", "LP"]
-            map_files = ["data/water/tip5p/water_OT.map",
-                         "data/water/tip5p/water_HT.map",
-                         "data/water/tip5p/water_LP.map"]
-            water_ref_file = os.path.join(d, "data/water/tip5p/water.pdbqt")
-
-        map_list.extend([os.path.join(d, map_file) for map_file in map_files])
-
-        self._water_map = Map(map_list, atom_types)
-        self._water_ref = Molecule.from_file(water_ref_file)
+        return energies
 
     def _optimize_disordered_waters(self, waters, connections):
         """Optimize water molecules on rotatable bonds."""
@@ -91,25 +128,26 @@ class WaterSampler():
         rotation = np.radians(self._rotation)
 
         # Iterate through every disordered bonds
-        for index, row in receptor.rotatable_bonds.iterrows():
+        for row in receptor.rotatable_bonds:
             energies = []
             angles = []
             rot_waters = []
 
             # Get index of all the waters attached
             # to a disordered group by looking at the connections
-            tmp = connections["atom_i"].isin(row[["atom_i", "atom_j"]])
+            tmp = connections["atom_i"].isin([row["atom_i"], row["atom_j"]])
             molecule_j = connections.loc[tmp]["molecule_j"].values
             rot_waters.extend([waters[j] for j in molecule_j])
 
             if rot_waters:
                 # Get energy of the favorable disordered waters
-                energy_waters = np.array([ad_map.energy(w.atom_informations(), ignore_electrostatic=True, 
-                                                        ignore_desolvation=True) for w in rot_waters])
-                energy_waters[energy_waters > 0] = 0
+                # The waters are still spherical at this stage, so one
+                # vectorized interpolation replaces the per-water calls
+                energy_waters = self._spherical_water_energies(ad_map, rot_waters)
                 energies.append(np.sum(energy_waters))
                 # Current angle of the disordered group
-                current_angle = utils.dihedral(row[["atom_i_xyz", "atom_j_xyz", "atom_k_xyz", "atom_l_xyz"]].values)
+                current_angle = utils.dihedral(np.array([row["atom_i_xyz"], row["atom_j_xyz"],
+                                                         row["atom_k_xyz"], row["atom_l_xyz"]]))
                 angles.append(current_angle)
 
                 """ Find all the atoms that depends on these atoms. This
@@ -128,16 +166,13 @@ class WaterSampler():
                     coordinates everytime. Coordinates should be extracted
                     before doing the optimization and only at the end
                     we update the coordinates of the water molecules."""
-                    for rot_water in rot_waters:
-                        p0 = rot_water.coordinates(1)[0]
-                        p_new = utils.rotate_point(p0, p1, p2, rotation)
-                        rot_water.update_coordinates(p_new, atom_id=1)
+                    water_xyzs = np.array([w.coordinates(1)[0] for w in rot_waters])
+                    water_xyzs = utils.rotate_point(water_xyzs, p1, p2, rotation)
+                    for rot_water, water_xyz in zip(rot_waters, water_xyzs):
+                        rot_water.update_coordinates(water_xyz, atom_id=1)
 
                     # Get energy and update the current angle (increment rotation)
-                    energy_waters = np.array([ad_map.energy(w.atom_informations(), ignore_electrostatic=True, 
-                                                            ignore_desolvation=True) for w in rot_waters])
-
-                    energy_waters[energy_waters > 0] = 0
+                    energy_waters = self._spherical_water_energies(ad_map, rot_waters)
                     energies.append(np.nansum(energy_waters))
                     current_angle += rotation
                     angles.append(current_angle)
@@ -150,13 +185,18 @@ class WaterSampler():
                 # Calculate the best angle, based on how much we rotated
                 best_angle = np.radians((360. - np.degrees(current_angle)) + np.degrees(angles[i]))
                 # Update coordinates to the choosen state
-                for rot_water in rot_waters:
-                    p0 = rot_water.coordinates(1)[0]
-                    p_new = utils.rotate_point(p0, p1, p2, best_angle)
-                    rot_water.update_coordinates(p_new, atom_id=1)
-                    # Update also the anchor point
-                    rot_water.hb_anchor = utils.rotate_point(rot_water.hb_anchor, p1, p2, best_angle)
-                    rot_water.hb_vector = utils.rotate_point(rot_water.hb_vector, p1, p2, best_angle)
+                water_xyzs = np.array([w.coordinates(1)[0] for w in rot_waters])
+                water_xyzs = utils.rotate_point(water_xyzs, p1, p2, best_angle)
+                # Update also the anchor points
+                anchor_xyzs = np.array([w.hb_anchor for w in rot_waters])
+                anchor_xyzs = utils.rotate_point(anchor_xyzs, p1, p2, best_angle)
+                vector_xyzs = np.array([w.hb_vector for w in rot_waters])
+                vector_xyzs = utils.rotate_point(vector_xyzs, p1, p2, best_angle)
+
+                for j, rot_water in enumerate(rot_waters):
+                    rot_water.update_coordinates(water_xyzs[j], atom_id=1)
+                    rot_water.hb_anchor = anchor_xyzs[j]
+                    rot_water.hb_vector = vector_xyzs[j]
 
         return disordered_energies
 
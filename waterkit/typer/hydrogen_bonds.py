@@ -11,12 +11,12 @@ from __future__ import print_function
 from __future__ import absolute_import
 
 import re
+from collections import deque
 from collections import namedtuple
 from collections import OrderedDict
 
 import numpy as np
 import openbabel as ob
-import pandas as pd
 
 from .. import utils
 
@@ -29,6 +29,10 @@ class HydrogenBonds():
         self._atom_types = OrderedDict()
         field_names = 'hb_type hb_strength hyb n_water hb_length ob_smarts'
         self._Atom_type = namedtuple('Atom_type', field_names)
+        # Bond adjacency of the molecule currently typed (see match)
+        self._adjacency = None
+        self._atomic_nums = None
+        self._neighbors_cache = {}
 
         self._load_param_file(fname)
 
@@ -81,39 +85,65 @@ class HydrogenBonds():
 
         return lst
 
+    def _build_adjacency(self, OBMol):
+        """
+        Build the bond adjacency lists and atomic numbers of the molecule
+        in one pass, so the BFS done for every anchor atom does not have
+        to go through OpenBabel again
+        """
+        n_atoms = OBMol.NumAtoms()
+        adjacency = [[] for _ in range(n_atoms + 1)]
+        atomic_nums = [0] * (n_atoms + 1)
+
+        for ob_atom in ob.OBMolAtomIter(OBMol):
+            atomic_nums[ob_atom.GetIdx()] = ob_atom.GetAtomicNum()
+
+        for ob_bond in ob.OBMolBondIter(OBMol):
+            begin_idx = ob_bond.GetBeginAtomIdx()
+            end_idx = ob_bond.GetEndAtomIdx()
+            adjacency[begin_idx].append(end_idx)
+            adjacency[end_idx].append(begin_idx)
+
+        self._adjacency = adjacency
+        self._atomic_nums = atomic_nums
+        # The neighbor coordinates memoized on the previous molecule
+        # are not valid anymore
+        self._neighbors_cache = {}
+
     def _neighbor_atoms(self, OBMol, start_index=1, depth=1, hydrogen=True):
         """
         Return a nested list of all the neighbor OBAtoms by following the bond connectivity
         https://baoilleach.blogspot.com/2008/02/calculate-circular-fingerprints-with.html
         """
         visited = [False] * (OBMol.NumAtoms() + 1)
-        neighbors = []
-        queue = list([(start_index, 0)])
+        # The levels are created upfront [[n], [n1, n2, ...], ...], the
+        # empty ones are removed at the end if the depth was too large
+        # compared to the molecule
+        neighbors = [[] for _ in range(depth + 1)]
+        queue = deque([(start_index, 0)])
         atomic_num_to_keep = 1
 
         if not hydrogen:
             atomic_num_to_keep = 2
 
-        while queue:
-            i, d = queue.pop(0)
+        if self._adjacency is None:
+            self._build_adjacency(OBMol)
 
-            ob_atom = OBMol.GetAtom(int(i))
+        while queue:
+            i, d = queue.popleft()
 
-            # If we construct the data structure before [[n], [n1, n2, ...], ...]
-            # and because the depth is too large compared to the molecule
-            # we will have some extra [] not filled
-            try:
-                neighbors[d].append(ob_atom)
-            except:
-                neighbors.append([])
-                neighbors[d].append(ob_atom)
+            neighbors[d].append(OBMol.GetAtom(int(i)))
 
             visited[i] = True
 
             if d < depth:
-                for a in ob.OBAtomAtomIter(ob_atom):
-                    if not visited[a.GetIdx()] and a.GetAtomicNum() >= atomic_num_to_keep:
-                        queue.append((a.GetIdx(), d + 1))
+                for j in self._adjacency[i]:
+                    if not visited[j] and self._atomic_nums[j] >= atomic_num_to_keep:
+                        queue.append((j, d + 1))
+
+        # Remove the levels that were never reached
+        while neighbors and not neighbors[-1]:
+            neighbors.pop()
 
         # We push all the hydrogen (= 1) atom to the end
         neighbors = [self._push_atom_to_end(x, 1) for x in neighbors]
@@ -125,6 +155,12 @@ class HydrogenBonds():
         Return a nested list of all the coordinates of all the neighbor
         atoms by following the bond connectivity
         """
+        key = (id_atom, depth, hydrogen)
+        coords = self._neighbors_cache.get(key)
+
+        if coords is not None:
+            return coords
+
         coords = []
 
         atoms = self._neighbor_atoms(OBMol, id_atom, depth, hydrogen)
@@ -133,12 +169,12 @@ class HydrogenBonds():
             tmp = [[ob_atom.GetX(), ob_atom.GetY(), ob_atom.GetZ()] for ob_atom in level]
             coords.append(np.array(tmp))
 
+        self._neighbors_cache[key] = coords
+
         return coords
 
     def _hb_vectors(self, OBMol, idx, hyb, n_hbond, hb_length):
         """Return all the hydrogen bond vectors the atom idx."""
-        vectors = []
-
         # Get origin atom
         ob_atom = OBMol.GetAtom(int(idx))
         anchor_xyz = np.array([ob_atom.GetX(), ob_atom.GetY(), ob_atom.GetZ()])
@@ -230,14 +266,15 @@ class HydrogenBonds():
                 angles = [0, -np.radians(120), np.radians(120)]
 
         # We rotate p to get each vectors if necessary
-        for angle in angles:
-            vector = p
-            if angle != 0.:
-                vector = utils.rotate_point(vector, anchor_xyz, r, angle)
-            vector = utils.resize_vector(vector, hb_length, anchor_xyz)
-            vectors.append(vector)
+        angles = np.asarray(angles)
+        vectors = np.tile(p, (angles.shape[0], 1))
+        to_rotate = angles != 0.
+
+        if np.any(to_rotate):
+            vectors[to_rotate] = utils.rotate_points(p, anchor_xyz, r, angles[to_rotate])
 
-        vectors = np.array(vectors)
+        # ... and all of them are resized to the hb_length in one pass
+        vectors = utils.resize_vectors(vectors, hb_length, anchor_xyz)
 
         return vectors
 
@@ -245,13 +282,15 @@ class HydrogenBonds():
         """ Guess all the hydrogen bonds anchors (donor/acceptor)
         in the molecule based on the hydrogen bond forcefield """
         data = []
-        columns = ["atom_i", "vector_xyz", "anchor_type", "anchor_name"]
+        dtype = [("atom_i", "i4"), ("vector_xyz", "f8", (3)), ("anchor_type", "U8"), ("anchor_name", "U10")]
+        # The bond graph is extracted once and reused for every anchor
+        self._build_adjacency(OBMol)
         # Keep track of all the visited atom
         visited = [False] * (OBMol.NumAtoms() + 1)
-        atom_types_available = list(self._atom_types.keys())
 
-        for name in atom_types_available[::-1]:
-            atom_type = self._atom_types[name]
+        # The OBSmartsPattern objects were compiled once when the
+        # parameter file was loaded, here they are only matched
+        for name, atom_type in reversed(list(self._atom_types.items())):
             atom_type.ob_smarts.Match(OBMol)
             matches = list(atom_type.ob_smarts.GetMapList())
 
@@ -275,12 +314,11 @@ class HydrogenBonds():
                         # Calculate the vectors on the anchor
                         vector_xyzs = self._hb_vectors(OBMol, idx, atom_type.hyb, atom_type.n_water, atom_type.hb_length)
                         for vector_xyz in vector_xyzs:
-                            data.append([idx, vector_xyz, hb_type, name])
+                            data.append((idx, vector_xyz, hb_type, name))
                     except:
                         print("Warning: Could not determine hydrogen bond vectors on atom %s of type %s." % (idx, name))
 
-        df = pd.DataFrame(data=data, columns=columns)
-        df.sort_values(by="atom_i", inplace=True)
-        df.reset_index(drop=True, inplace=True)
+        anchors = np.array(data, dtype=dtype)
+        anchors = anchors[np.argsort(anchors["atom_i"], kind="stable")]
 
-        return df
+        return anchors
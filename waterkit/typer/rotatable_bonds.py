@@ -17,7 +17,6 @@ from collections import OrderedDict
 
 import numpy as np
 import openbabel as ob
-import pandas as pd
 
 
 class RotatableBonds():
@@ -61,16 +60,19 @@ class RotatableBonds():
             OBMol (OBMol): OBMol object
 
         Returns:
-            DataFrame: contains all the informations about the rotatable bonds.
+            ndarray: structured array containing all the informations
+            about the rotatable bonds.
 
-            The DataFrame contains 8 different columns: atom_i, atom_j,
+            The array contains 8 different fields: atom_i, atom_j,
             atom_i_xyz, atom_j_xyz, atom_k_xyz, atom_l_xyz, rotamers and
             the name of rotatable bond
 
         """
         data = []
-        columns = ["atom_i", "atom_j", "atom_i_xyz", "atom_j_xyz", 
-                   "atom_k_xyz", "atom_l_xyz", "rotamers", "name"]
+        dtype = [("atom_i", "i4"), ("atom_j", "i4"),
+                 ("atom_i_xyz", "f8", (3)), ("atom_j_xyz", "f8", (3)),
+                 ("atom_k_xyz", "f8", (3)), ("atom_l_xyz", "f8", (3)),
+                 ("rotamers", "O"), ("name", "U24")]
         
         for name in self._rotatable_bonds:
             unique = []
@@ -100,8 +102,7 @@ class RotatableBonds():
                     data.append((match[0], match[1], atom_i_xyz, atom_j_xyz,
                                 atom_k_xyz, atom_l_xyz, rotatable_bond.rotamers, name))
 
-        df = pd.DataFrame(data=data, columns=columns)
-        df.sort_values(by="atom_i", inplace=True)
-        df.reset_index(drop=True, inplace=True)
+        bonds = np.array(data, dtype=dtype)
+        bonds = bonds[np.argsort(bonds["atom_i"], kind="stable")]
 
-        return df
+        return bonds
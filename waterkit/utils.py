@@ -8,6 +8,8 @@
 
 import tempfile
 import contextlib
+import functools
+import importlib
 import shutil
 import copy
 import errno
@@ -15,11 +17,6 @@ import os
 import subprocess
 import sys
 
-if sys.version_info >= (3, ):
-    import importlib
-else:
-    import imp
-
 import numpy as np
 
 
@@ -178,6 +175,38 @@ def rotate_point(p, p1, p2, angle):
     return p
 
 
+def rotate_points(p, p1, p2, angles):
+    """ Rotate the point p around the axis p1-p2 by multiple angles at once
+    Returns the rotated points as a (n, 3) ndarray, one row per angle """
+    # Translate the point we want to rotate to the origin
+    pn = p - p1
+
+    # Get the unit vector from the axis p1-p2
+    n = p2 - p1
+    n = normalize(n)
+    x, y, z = n[0], n[1], n[2]
+
+    # Setup one rotation matrix per angle
+    angles = np.asarray(angles)
+    c = np.cos(angles)
+    t = 1. - np.cos(angles)
+    s = np.sin(angles)
+
+    R = np.empty((angles.shape[0], 3, 3))
+    R[:, 0, 0] = t * x ** 2 + c
+    R[:, 0, 1] = t * x * y - s * z
+    R[:, 0, 2] = t * x * z + s * y
+    R[:, 1, 0] = t * x * y + s * z
+    R[:, 1, 1] = t * y ** 2 + c
+    R[:, 1, 2] = t * y * z - s * x
+    R[:, 2, 0] = t * x * z - s * y
+    R[:, 2, 1] = t * y * z + s * x
+    R[:, 2, 2] = t * z ** 2 + c
+
+    # ... apply them all in one shot and put the points back
+    return np.einsum("j,ijk->ik", pn, R) + p1
+
+
 def resize_vector(v, length, origin=None):
     """ Resize a vector v to a new length in regard to a origin """
     if origin is not None:
@@ -186,6 +215,17 @@ def resize_vector(v, length, origin=None):
         return normalize(v) * length
 
 
+def resize_vectors(v, length, origin=None):
+    """ Resize multiple vectors v to a new length in regard to a origin """
+    v = np.atleast_2d(v)
+
+    if origin is not None:
+        v = v - origin
+        return (v / np.linalg.norm(v, axis=1)[:, None]) * length + origin
+    else:
+        return (v / np.linalg.norm(v, axis=1)[:, None]) * length
+
+
 def generate_random_sphere(center, radius=1, size=100):
     """
     Generate a sphere with random point
@@ -357,24 +397,19 @@ def execute_command(cmd_line):
     return output, errors
 
 
+@functools.lru_cache(maxsize=None)
 def path_module(module_name):
-    try:
-        specs = importlib.machinery.PathFinder().find_spec(module_name)
-
-        if specs is not None:
-            return specs.submodule_search_locations[0]
-    except:
-        try:
-            _, path, _ = imp.find_module(module_name)
-            abspath = os.path.abspath(path)
-            return abspath
-        except ImportError:
-            return None
+    specs = importlib.machinery.PathFinder().find_spec(module_name)
+
+    if specs is not None:
+        return specs.submodule_search_locations[0]
 
     return None
 
 
 def split_list_in_chunks(size, n):
+    # No more chunks than elements, otherwise some would be empty
+    n = min(n, size)
     return [(l[0], l[-1]) for l in np.array_split(range(size), n)]
 
 
@@ -636,6 +671,12 @@ def prepare_water_map(ad_map, water_model="tip3p", dielectric=1.):
     else:
         raise RuntimeError("Water model %s unknown." % water_model)
 
+    """Calling this function twice on the same map must be a no-op.
+    Once the electrostatic map was consumed, the water maps are already
+    prepared and combining them a second time would corrupt them."""
+    if e_type not in map_info["maps"] and hw_type in map_info["maps"]:
+        return
+
     if missing:
         raise RuntimeError('Atom type(s) %s is(are) missing for %s water model.' % (list(missing), water_model))
 
@@ -10,13 +10,146 @@ import copy
 import os
 
 import numpy as np
-import pandas as pd
 import openbabel as ob
 
 from .molecule import Molecule
 from . import utils
 
 
+def _build_local_water_atoms(water_model, hb_type):
+    """Construct the canonical H/Lp positions of a water molecule
+    in its local frame: oxygen at the origin, anchor along the x axis
+    and the perpendicular rotation axis along the y axis.
+
+    The construction only depends on the water model and on the anchor
+    type, so it is done once at import time. Waters are then built by
+    moving these constant positions into the oxygen-anchor frame.
+    """
+    oxygen_xyz = np.zeros(3)
+    v = np.array([1., 0., 0.])
+    p = np.array([0., 1., 0.])
+
+    if water_model == "tip3p":
+        distances = [0.9572, 0.9572, 1.0]
+        angles = [104.52, 127.74]
+    elif water_model == "tip5p":
+        distances = [0.9572, 0.9572, 0.7, 0.7]
+        angles = [104.52, 109.47]
+
+    # If donor, we started by building the lone-pairs first
+    if hb_type == "donor":
+        distances.reverse()
+        angles.reverse()
+
+    # H/Lp between O and Acceptor/Donor atom
+    a1_xyz = oxygen_xyz + (distances[0] * v)
+    # Build the second H/Lp using the perpendicular vector p
+    a2_xyz = utils.rotate_point(a1_xyz, oxygen_xyz, p, np.radians(angles[0]))
+    a2_xyz = utils.resize_vector(a2_xyz, distances[1], oxygen_xyz)
+
+    if water_model == "tip3p" and hb_type == "donor":
+        # Build the third H/Lp using the perpendicular vector p
+        a3_xyz = utils.rotate_point(a2_xyz, oxygen_xyz, p, np.radians(angles[1]))
+        a3_xyz = utils.resize_vector(a3_xyz, distances[2], oxygen_xyz)
+    elif water_model == "tip5p":
+        # ... and rotate it to build the last H/Lp
+        w = utils.atom_to_move(oxygen_xyz, [a1_xyz, a2_xyz])
+        r = oxygen_xyz + utils.normalize(utils.vector(a1_xyz, a2_xyz))
+        a3_xyz = utils.rotate_point(w, oxygen_xyz, r, np.radians(angles[1] / 2.))
+        a3_xyz = utils.resize_vector(a3_xyz, distances[3], oxygen_xyz)
+        a4_xyz = utils.rotate_point(w, oxygen_xyz, r, -np.radians(angles[1] / 2.))
+        a4_xyz = utils.resize_vector(a4_xyz, distances[3], oxygen_xyz)
+
+    # Select the right atoms and their order
+    if water_model == "tip3p":
+        if hb_type == "acceptor":
+            atoms = [a1_xyz, a2_xyz]
+        else:
+            atoms = [a2_xyz, a3_xyz]
+    elif water_model == "tip5p":
+        # Order them: H, H, Lp, Lp, we want hydrogen atoms first
+        if hb_type == "acceptor":
+            atoms = [a1_xyz, a2_xyz, a3_xyz, a4_xyz]
+        else:
+            atoms = [a3_xyz, a4_xyz, a1_xyz, a2_xyz]
+
+    return np.array(atoms)
+
+
+# Canonical H/Lp positions in the water local frame, built once
+_LOCAL_WATER_ATOMS = {(water_model, hb_type): _build_local_water_atoms(water_model, hb_type)
+                      for water_model in ("tip3p", "tip5p")
+                      for hb_type in ("acceptor", "donor")}
+
+
+class WaterBatch():
+
+    def __init__(self, xyzs, atom_types):
+        """Initialize a WaterBatch object.
+
+        A WaterBatch is a structure-of-arrays view of a list of water
+        molecules: all the coordinates are stacked in one (n_waters,
+        n_atoms, 3) array, so energy evaluations are done with one
+        vectorized call per atom type instead of one call per water.
+        All the waters must share the same topology (all spherical,
+        all TIP3P, ...).
+
+        Args:
+            xyzs (ndarray): coordinates of the waters (n_waters, n_atoms, 3)
+            atom_types (array_like): atom type of each of the n_atoms atoms
+
+        """
+        self.xyzs = xyzs
+        self.atom_types = atom_types
+
+    @classmethod
+    def from_waters(cls, waters):
+        """Create a WaterBatch object from a list of Water objects.
+
+        Args:
+            waters (list): list of Water molecule objects with the same topology
+
+        Returns:
+            WaterBatch: batched view of the waters
+
+        """
+        xyzs = np.array([w.coordinates() for w in waters])
+        # atleast_1d, because atom_types() is 0-d for spherical waters
+        atom_types = np.atleast_1d(waters[0].atom_types())
+
+        return cls(xyzs, atom_types)
+
+    def translate(self, vector):
+        """Translate all the water molecules in one shot.
+
+        Args:
+            vector (array_like): 3d vector
+
+        Returns:
+            None
+
+        """
+        self.xyzs += vector
+
+    def energies(self, ad_map):
+        """Grid energy of each water molecule in the batch.
+
+        Args:
+            ad_map (Map): autodock map object
+
+        Returns:
+            ndarray: energy of each water molecule
+
+        """
+        energies = np.zeros(self.xyzs.shape[0])
+
+        # One interpolation per atom type, over the whole batch
+        for i, atom_type in enumerate(self.atom_types):
+            energies += ad_map.energy_coordinates(self.xyzs[:, i], atom_type)
+
+        return energies
+
+
 class Water(Molecule):
 
     def __init__(self, xyz, atom_type="W", partial_charge=0., hb_anchor=None, hb_vector=None, hb_type=None):
@@ -34,6 +167,8 @@ class Water(Molecule):
         self.atoms = None
         self.hydrogen_bonds = None
         self.rotatable_bonds = None
+        self._coordinates = None
+        self._kdtree = None
 
         if hb_anchor is None:
             self.hb_anchor = np.array([0, 0, 0])
@@ -111,6 +246,10 @@ class Water(Molecule):
         else:
             self.atoms = new_atom
 
+        # The cached coordinates and kdtree are not valid anymore
+        self._coordinates = None
+        self._kdtree = None
+
     def _delete_atoms(self, atom_ids):
         """Delete atoms from the water. ids are atom ids and not array indices.
         Only the hydrogens and lone pairs are deleted, never the oxygen atom."""
@@ -125,6 +264,9 @@ class Water(Molecule):
             self.atoms = np.delete(self.atoms, atom_ids - 1)
             # From 1 to num_atom + 1, because atom ids are 1-based
             self.atoms["i"] = np.arange(1, self.atoms.shape[0] + 1)
+            # The cached coordinates and kdtree are not valid anymore
+            self._coordinates = None
+            self._kdtree = None
             return True
         else:
             return False
@@ -157,8 +299,8 @@ class Water(Molecule):
             w = copy.deepcopy(self)
             # Atom ids are 1-based, and LP corresponds to atom 4 and 5
             w._delete_atoms([4, 5])
-            # hbond df is 0-based, and so LP corresponds to index 2 and 3
-            w.hydrogen_bonds.drop([2, 3], inplace=True)
+            # hbond array is 0-based, and so LP corresponds to index 2 and 3
+            w.hydrogen_bonds = np.delete(w.hydrogen_bonds, [2, 3])
 
             return w
             
@@ -191,44 +333,20 @@ class Water(Molecule):
             print("Error: water model %s unknown." % water_model)
             return False
 
-        if water_model == "tip3p":
-            distances = [0.9572, 0.9572, 1.0]
-            angles = [104.52, 127.74]
-        elif water_model == "tip5p":
-            distances = [0.9572, 0.9572, 0.7, 0.7]
-            angles = [104.52, 109.47]
-
-        # If donor, we started by building the lone-pairs first
-        if self.hb_type == "donor":
-            distances.reverse()
-            angles.reverse()
-
         oxygen_xyz = self.coordinates(1)[0]
+        hb_type = "donor" if self.hb_type == "donor" else "acceptor"
 
         # For both TIP3P and TIP5P
-        # Vector between O and the Acceptor/Donor atom
-        v = utils.vector(oxygen_xyz, self.hb_anchor)
-        v = utils.normalize(v)
-        # Compute a vector perpendicular to v
-        p = oxygen_xyz + utils.get_perpendicular_vector(v)
-        # H/Lp between O and Acceptor/Donor atom
-        a1_xyz = oxygen_xyz + (distances[0] * v)
-        # Build the second H/Lp using the perpendicular vector p
-        a2_xyz = utils.rotate_point(a1_xyz, oxygen_xyz, p, np.radians(angles[0]))
-        a2_xyz = utils.resize_vector(a2_xyz, distances[1], oxygen_xyz)
-
-        if water_model == "tip3p" and self.hb_type == "donor":
-            # Build the second H/Lp using the perpendicular vector p
-            a3_xyz = utils.rotate_point(a2_xyz, oxygen_xyz, p, np.radians(angles[1]))
-            a3_xyz = utils.resize_vector(a3_xyz, distances[2], oxygen_xyz)
-        elif water_model == "tip5p":
-            # ... and rotate it to build the last H/Lp
-            v = utils.atom_to_move(oxygen_xyz, [a1_xyz, a2_xyz])
-            r = oxygen_xyz + utils.normalize(utils.vector(a1_xyz, a2_xyz))
-            a3_xyz = utils.rotate_point(v, oxygen_xyz, r, np.radians(angles[1] / 2.))
-            a3_xyz = utils.resize_vector(a3_xyz, distances[3], oxygen_xyz)
-            a4_xyz = utils.rotate_point(v, oxygen_xyz, r, -np.radians(angles[1] / 2.))
-            a4_xyz = utils.resize_vector(a4_xyz, distances[3], oxygen_xyz)
+        # The H/Lp positions in the water local frame are constants, so
+        # only the rigid-body frame oxygen-anchor has to be computed here
+        # Unit vector between O and the Acceptor/Donor atom
+        x = utils.normalize(utils.vector(oxygen_xyz, self.hb_anchor))
+        # Compute a vector perpendicular to x
+        y = utils.normalize(utils.get_perpendicular_vector(x))
+        z = np.cross(x, y)
+
+        # One rotation + translation instead of rebuilding the whole geometry
+        atoms = oxygen_xyz + _LOCAL_WATER_ATOMS[(water_model, hb_type)].dot(np.vstack((x, y, z)))
 
         """ Only now we do all the modifications to the 
         atoms. We never know, we might have an error 
@@ -247,19 +365,6 @@ class Water(Molecule):
             self.atoms[0]["t"] = atom_types[0]
             self._delete_atoms(range(2, self.atoms.size + 1))
 
-        # Select the right atom to add and their order
-        if water_model == "tip3p":
-            if self.hb_type == "acceptor":
-                atoms = [a1_xyz, a2_xyz]
-            else:
-                atoms = [a2_xyz, a3_xyz]
-        elif water_model == "tip5p":
-            # Order them: H, H, Lp, Lp, we want hydrogen atoms first
-            if self.hb_type == "acceptor":
-                atoms = [a1_xyz, a2_xyz, a3_xyz, a4_xyz]
-            else:
-                atoms = [a3_xyz, a4_xyz, a1_xyz, a2_xyz]
-
         # ... and add the new ones
         for atom, atom_type, partial_charge in zip(atoms, atom_types[1:], partial_charges[1:]):
             self._add_atom(atom, atom_type, partial_charge)
@@ -274,7 +379,7 @@ class Water(Molecule):
         TIP5P water molecule. We do not need the waterfield here. """
         hb_length = 2.8
         angle_lp = 109.47
-        columns = ["atom_i", "vector_xyz", "anchor_type", "anchor_name"]
+        dtype = [("atom_i", "i4"), ("vector_xyz", "f8", (3)), ("anchor_type", "U8"), ("anchor_name", "U10")]
         data = []
 
         oxygen_xyz = self.coordinates(1)[0]
@@ -307,7 +412,7 @@ class Water(Molecule):
             vector_xyz = utils.resize_vector(atom["xyz"], hb_length, oxygen_xyz)
             data.append((i + 1, vector_xyz, hb_type, hb_name))
 
-        self.hydrogen_bonds = pd.DataFrame(data=data, columns=columns)
+        self.hydrogen_bonds = np.array(data, dtype=dtype)
 
     def translate(self, vector):
         """Translate the water molecule.
@@ -319,10 +424,14 @@ class Water(Molecule):
             None
 
         """
-        water_xyz = self.coordinates() + vector
-        for atom_id, coord_xyz in enumerate(water_xyz):
-            # +1, because atom ids are 1-based
-            self.update_coordinates(coord_xyz, atom_id + 1)
+        # All the atoms are moved in one shot. The vector is flattened
+        # so a (1, 3) vector, as passed by the position sampling, also
+        # broadcasts over the 0-d atoms array of a spherical water
+        vector = np.ravel(vector)
+        self.atoms["xyz"] += vector
+        # The cached coordinates and kdtree are not valid anymore
+        self._coordinates = None
+        self._kdtree = None
 
         # We have also to translate the hydrogen bond vectors if present
         if self.hydrogen_bonds is not None:
@@ -380,13 +489,16 @@ class Water(Molecule):
         
         r = oxygen_xyz + utils.normalize(utils.vector(ref_xyz, oxygen_xyz))
 
-        for atom_id in atom_ids:
-            # -1, because array is 0-based
-            coord_xyz = utils.rotate_point(water_xyz[atom_id - 1], oxygen_xyz, r, np.radians(angle))
-            self.update_coordinates(coord_xyz, atom_id)
+        # All the moving atoms are rotated in one shot, rotate_point
+        # handles multiple points around the same axis natively
+        # -1, because array is 0-based
+        indices = np.asarray(atom_ids) - 1
+        self.atoms["xyz"][indices] = utils.rotate_point(water_xyz[indices], oxygen_xyz, r, np.radians(angle))
+        # The cached coordinates and kdtree are not valid anymore
+        self._coordinates = None
+        self._kdtree = None
 
         # We have also to rotate the hydrogen bond vectors if present
         if self.hydrogen_bonds is not None:
-            for index, vector in self.hydrogen_bonds.iterrows():
-                vector_xyz = utils.rotate_point(vector["vector_xyz"], oxygen_xyz, r, np.radians(angle))
-                self.hydrogen_bonds.at[index, "vector_xyz"] = vector_xyz
+            vectors_xyz = self.hydrogen_bonds["vector_xyz"]
+            self.hydrogen_bonds["vector_xyz"] = utils.rotate_point(vectors_xyz, oxygen_xyz, r, np.radians(angle))
@@ -20,6 +20,14 @@ from .water import Water
 from .sampling import WaterSampler
 from . import utils
 
+"""In the PDB format, the chain id is encoded with only one character
+and the chain A is reserved for the receptor, so the water shells are
+limited to the 25 remaining letters (B to Z)."""
+MAX_WATER_SHELLS = len(ascii_uppercase) - 1
+
+# PDB ATOM record template, compiled once for all the writers
+PDB_ATOM_STR = "ATOM  %5d  %-4s%-3s%2s%4d    %8.3f%8.3f%8.3f  1.00  1.00          %2s\n"
+
 
 class WaterBox():
 
@@ -47,8 +55,21 @@ class WaterBox():
         self._wopt = WaterSampler(self, temperature=self._temperature, spherical_water_map=spherical_water_map)
 
     def copy(self):
-        """Return deepcopy of WaterBox."""
-        return copy.deepcopy(self)
+        """Return deepcopy of WaterBox.
+
+        The receptor and the read-only data of the sampler (water
+        orientations, water grids, reference water) are never modified
+        during the shell growth, so they are shared with the copy
+        instead of being duplicated; only the mutable state of the box
+        (waters, maps, informations) is really deep-copied.
+        """
+        # Pre-seeding the memo makes deepcopy return these objects
+        # as is instead of recursing into them
+        shared = [self.molecules[0], self._wopt._water_orientations,
+                  self._wopt._water_map, self._wopt._water_ref]
+        memo = {id(obj): obj for obj in shared}
+
+        return copy.deepcopy(self, memo)
 
     def _add_receptor(self, receptor):
         """Add the receptor and the corresponding ad_map to the waterbox."""
@@ -71,9 +92,9 @@ class WaterBox():
 
         molecule_ids = list(self.molecules.keys())
 
-        try:
-            last_key = np.max(molecule_ids)
-        except:
+        if molecule_ids:
+            last_key = max(molecule_ids)
+        else:
             # We initliaze at -1, make first molecule at index 0
             last_key = -1
 
@@ -89,11 +110,12 @@ class WaterBox():
 
     def _add_connections(self, connections):
         """ Add connections between molecules """
-        try:
-            last_connections = self.df["connections"].tail(1)
+        last_connections = self.df["connections"].tail(1)
+
+        if not last_connections.empty:
             last_molecule_i = last_connections["molecule_i"].values[0]
             last_molecule_j = last_connections["molecule_j"].values[0]
-        except:
+        else:
             last_molecule_i = -1
             last_molecule_j = 0
 
@@ -108,10 +130,11 @@ class WaterBox():
         if not isinstance(molecules, (list, tuple)):
             molecules = [molecules]
 
-        try:
-            last_kdtree_relations = self.df["kdtree_relations"].tail(1)
+        last_kdtree_relations = self.df["kdtree_relations"].tail(1)
+
+        if not last_kdtree_relations.empty:
             last_molecule_i = last_kdtree_relations["molecule_i"].values[0]
-        except:
+        else:
             # We initliaze at -1, make first molecule at index 0
             last_molecule_i = -1
 
@@ -132,10 +155,8 @@ class WaterBox():
 
         # Update the KDTree
         data = np.vstack(data)
-        try:
+        if self._kdtree is not None:
             data = np.concatenate((self._kdtree.data, data))
-        except:
-            pass
         self._kdtree = spatial.cKDTree(data)
 
     def _add_informations(self, data, where):
@@ -182,6 +203,24 @@ class WaterBox():
 
         return molecules
 
+    def molecules_grouped_by_shell(self):
+        """Get the water molecules of all the hydration shells in one pass.
+
+        Returns:
+            list: one list of water molecules per shell id, from 1 to
+            the last shell (the receptor, shell 0, is not included)
+
+        """
+        n_shells = int(self.number_of_shells())
+        shells = [[] for _ in range(n_shells)]
+
+        # One traversal instead of one molecules_in_shell scan per shell
+        for index, shell_id in self.df["shells"]["shell_id"].items():
+            if shell_id > 0:
+                shells[shell_id - 1].append(self.molecules[index])
+
+        return shells
+
     def molecule_informations_in_shell(self, shell_id):
         """Get information of shell.
 
@@ -246,16 +285,16 @@ class WaterBox():
             for index, row in df.iterrows():
                 try:
                     hydrogen_bonds = self.molecules[row["molecule_i"]].hydrogen_bonds
-                    hba = hydrogen_bonds.loc[hydrogen_bonds["atom_i"] == row["atom_i"]]
+                    hba = hydrogen_bonds[hydrogen_bonds["atom_i"] == row["atom_i"]]
                     hba_xyz = self.molecules[row["molecule_i"]].coordinates(row["atom_i"])
 
                     hba_distance = utils.get_euclidean_distance(xyz, hba_xyz)[0]
-                    hbv_distances = utils.get_euclidean_distance(xyz, hba.vectors)
+                    hbv_distances = utils.get_euclidean_distance(xyz, hba["vector_xyz"])
                     hbv_min_distance = np.min(hbv_distances)
                     hbv_min_id = np.argmin(hbv_distances)
 
                     # We add 1 A to interpolate the distance to the heavy atom
-                    if hba.type == "donor":
+                    if hba["anchor_type"][0] == "donor":
                         hba_distance += 1.
 
                     # Select the closest HBV and make sure that the heavy atom is close enough
@@ -285,15 +324,16 @@ class WaterBox():
         data = []
 
         for i, molecule in enumerate(molecules):
-            for index, row in molecule.hydrogen_bonds.iterrows():
+            for row in molecule.hydrogen_bonds:
                 # Add water molecule only if it's in the map
-                anchor_xyz = molecule.coordinates(row.atom_i)[0]
+                anchor_xyz = molecule.coordinates(row["atom_i"])[0]
 
                 if self.map.is_in_map(anchor_xyz):
-                    w = Water(row.vector_xyz, atom_type, partial_charge, anchor_xyz, row.vector_xyz, row.anchor_type)
-                    
+                    w = Water(row["vector_xyz"], atom_type, partial_charge, anchor_xyz,
+                              row["vector_xyz"], row["anchor_type"])
+
                     waters.append(w)
-                    data.append((i, row.atom_i, len(waters) - 1, None))
+                    data.append((i, row["atom_i"], len(waters) - 1, None))
 
         # Convert list of tuples into dataframe
         columns = ["molecule_i", "atom_i", "molecule_j", "atom_j"]
@@ -357,18 +397,17 @@ class WaterBox():
         """
         i = 1
         j = 1
-        output_str = ""
-        pdb_str = "ATOM  %5d  %-4s%-3s%2s%4d    %8.3f%8.3f%8.3f  1.00  1.00          %2s\n"
+        lines = []
+        pdb_str = PDB_ATOM_STR
 
-        shell_id = self.number_of_shells()
-        water_shells = [self.molecules_in_shell(i) for i in range(1, shell_id + 1)]
+        water_shells = self.molecules_grouped_by_shell()
 
         if include_receptor:
             atoms = self.molecules[0].atoms
             for atom in atoms:
                 x, y, z = atom["xyz"]
-                output_str += pdb_str % (atom["i"], atom["name"], atom["resname"], "A", atom["resnum"],
-                                         x, y, z, atom["t"])
+                lines.append(pdb_str % (atom["i"], atom["name"], atom["resname"], "A", atom["resnum"],
+                                        x, y, z, atom["t"]))
 
             # Get the index of the nex atom and residue
             i = atom["i"] + 1
@@ -377,24 +416,30 @@ class WaterBox():
         for water_shell, chain in zip(water_shells, ascii_uppercase[1:]):
             j = 1
 
-            for water in water_shell:
-                c = water.coordinates()
+            if not water_shell:
+                continue
+
+            # The coordinates of the whole shell are stacked in one
+            # (n_waters, n_atoms, 3) array before the formatting pass
+            cs = np.stack([water.coordinates() for water in water_shell])
 
-                output_str += pdb_str % (i, "O", "HOH", chain, j, c[0][0], c[0][1], c[0][2], "O")
-                output_str += pdb_str % (i + 1, "H1", "HOH", chain, j, c[1][0], c[1][1], c[1][2], "H")
-                output_str += pdb_str % (i + 2, "H2", "HOH", chain, j, c[2][0], c[2][1], c[2][2], "H")
+            for c in cs:
+                lines.append(pdb_str % (i, "O", "HOH", chain, j, c[0][0], c[0][1], c[0][2], "O"))
+                lines.append(pdb_str % (i + 1, "H1", "HOH", chain, j, c[1][0], c[1][1], c[1][2], "H"))
+                lines.append(pdb_str % (i + 2, "H2", "HOH", chain, j, c[2][0], c[2][1], c[2][2], "H"))
                 i += 2
 
                 if water_model == 'tip5p':
-                    output_str += pdb_str % (i + 3, "L1", "HOH", chain, j, c[3][0], c[3][1], c[3][2], "L")
-                    output_str += pdb_str % (i + 4, "L2", "HOH", chain, j, c[4][0], c[4][1], c[4][2], "L")
+                    lines.append(pdb_str % (i + 3, "L1", "HOH", chain, j, c[3][0], c[3][1], c[3][2], "L"))
+                    lines.append(pdb_str % (i + 4, "L2", "HOH", chain, j, c[4][0], c[4][1], c[4][2], "L"))
                     i += 2
 
                 i += 1
                 j += 1
 
         # ... but we add it again at the end
-        output_str += "TER\n"
+        lines.append("TER\n")
 
+        # All the lines are joined and written in one shot
         with open(fname, "w") as w:
-            w.write(output_str)
+            w.write("".join(lines))
@@ -14,7 +14,7 @@ import multiprocessing as mp
 
 from tqdm import tqdm
 
-from .water_box import WaterBox
+from .water_box import WaterBox, MAX_WATER_SHELLS
 from . import utils
 
 
@@ -24,31 +24,26 @@ def _hydrate_single(water_box, n_layer=0, start=0, stop=1, output_dir=".", posit
                     desc='job %02d' % (position + 1),
                     bar_format='{l_bar}{bar:50}{r_bar}{bar:-10b}')
 
-    for frame_id in range(start, stop + 1):
-        i = 1
+    """Build n_layer shells per frame; n_layer = 0 means the box is
+    filled completely, within the maximum number of shells that can
+    be written in the PDB format (see MAX_WATER_SHELLS)."""
+    if n_layer > 0:
+        max_shells = min(n_layer, MAX_WATER_SHELLS)
+    else:
+        max_shells = MAX_WATER_SHELLS
 
+    for frame_id in range(start, stop + 1):
         # Create a copy of the waterbox,
         # because otherwise it won't work...
         w_copy = water_box.copy()
 
-        while True:
+        for _ in range(max_shells):
             # build_next_shell returns True if
             # it was able to put water molecules,
-            # otherwise it returns False and we break
-            if w_copy.build_next_shell():
-                pass
-            else:
+            # otherwise it returns False and we stop
+            if not w_copy.build_next_shell():
                 break
 
-            """Stop after building n_layer or when the number of
-            layers is equal to 26. In the PDB format, the segid
-            is encoded with only one caracter, so the maximum number
-            of layers is 26, which corresponds to the letter Z."""
-            if i == n_layer or i == 26:
-                break
-
-            i += 1
-
         progress.update(1)
 
         output_filename = os.path.join(output_dir, "water_%06d.pdb" % (frame_id + 1))